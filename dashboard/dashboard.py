@@ -2,8 +2,8 @@ import streamlit as st
 import pandas as pd
 from supabase import create_client, Client
 import json
-from model import analyze_report
-from utils import find_similar_companies, get_industry_companies_with_metrics
+from concurrent.futures import ThreadPoolExecutor
+from utils import find_similar_companies, format_numbers, get_industry_companies_with_metrics, optimize_dtypes
 
 # Set the layout for the page
 st.set_page_config(layout="wide") 
@@ -18,32 +18,62 @@ def init_supabase() -> Client:
 supabase = init_supabase()
 
 # Load data from Supabase
+def fetch_table(table_name: str) -> pd.DataFrame:
+    response = supabase.table(table_name).select("*").execute()
+    return pd.DataFrame(response.data)
+
 @st.cache_data(ttl=600)  # Cache for 10 minutes
-def load_data_from_supabase(table_name: str) -> pd.DataFrame:
-    try:
-        response = supabase.table(table_name).select("*").execute()
-        return pd.DataFrame(response.data)
-    except Exception as e:
-        st.error(f"Error loading {table_name}: {e}")
-        return pd.DataFrame()
-
-# Utils
-def format_number(val):
-    try:
-        val = float(val)
-        return f"{int(val):,}" if val.is_integer() else f"{val:,.2f}"
-    except Exception:
-        return val
+def load_data_from_supabase(table_names: tuple) -> tuple:
+    """Return ({name: DataFrame}, ticker-to-sector Series), indexed once per load."""
+    # Each table is a separate REST round trip, so fetch them side by side
+    with ThreadPoolExecutor(max_workers=len(table_names)) as ex:
+        futures = {name: ex.submit(fetch_table, name) for name in table_names}
+
+    tables = {}
+    for name, future in futures.items():
+        try:
+            data = optimize_dtypes(future.result())
+        except Exception as e:
+            st.error(f"Error loading {name}: {e}")
+            data = pd.DataFrame()
+        # Index company tables by ticker (sector means by sector) so per-section lookups
+        # are hash probes, not column scans
+        if 'ticker' in data.columns:
+            data = data.set_index('ticker', drop=False).rename_axis(None)
+        elif 'sector' in data.columns:
+            data = data.set_index('sector')
+        tables[name] = data
+
+    # Ticker-to-sector map (a ticker-indexed Series; .get works like a dict)
+    ticker_to_sector = pd.Series(dtype=object)
+    financial_df = tables.get("Financial Data", pd.DataFrame())
+    if 'ticker' in financial_df.columns and 'sector' in financial_df.columns:
+        ticker_to_sector = financial_df.drop_duplicates('ticker', keep='last').set_index('ticker')['sector']
+    return tables, ticker_to_sector
+
+# Peer lookups only depend on the dataset, so reruns reuse them; expire with the loader's
+# data and cap the per-ticker entries so the caches don't grow for the server's lifetime
+@st.cache_data(ttl=600, max_entries=8, show_spinner=False)
+def similar_companies(df: pd.DataFrame) -> dict:
+    return find_similar_companies(df, threshold=0.1)
+
+@st.cache_data(ttl=600, max_entries=256, show_spinner=False)
+def industry_peers(df: pd.DataFrame, ticker: str, metrics: tuple) -> dict:
+    return {metric: get_industry_companies_with_metrics(df, ticker, metric, top_n=3) for metric in metrics}
 
 # Read definitions from definitions.json
-with open("dashboard/definitions.json", "r", encoding="utf-8") as f:
-    definitions_data = json.load(f)
-    definitions = {}
-    for metric in definitions_data["metrics"]:
-        definitions[metric["id"]] = metric["definition"]
-        definitions[metric["name"]] = metric["definition"]
-        for alias in metric.get("aliases", []):
-            definitions[alias] = metric["definition"]
+@st.cache_data
+def load_definitions(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        definitions_data = json.load(f)
+    # Every id, name and alias points at the metric's definition
+    return {
+        key: metric["definition"]
+        for metric in definitions_data["metrics"]
+        for key in (metric["id"], metric["name"], *metric.get("aliases", []))
+    }
+
+definitions = load_definitions("dashboard/definitions.json")
 
 # Sidebar for navigation
 with st.sidebar.expander("Navigation", expanded=True):
@@ -55,10 +85,12 @@ if page == "Financial Dashboard":
 
     # Load data from Supabase tables
     with st.spinner("Loading data from database..."):
-        financial_df = load_data_from_supabase("Financial Data")
-        balance_sheet_df = load_data_from_supabase("Balance Sheet")
-        cash_flow_df = load_data_from_supabase("Cash Flow")
-        sector_means_df = load_data_from_supabase("Sector Means")
+        tables, ticker_to_sector = load_data_from_supabase(("Financial Data", "Balance Sheet", "Cash Flow", "Sector Means"))
+        financial_df = tables["Financial Data"]
+        balance_sheet_df = tables["Balance Sheet"]
+        cash_flow_df = tables["Cash Flow"]
+        # Already indexed by sector
+        sector_means_df = tables["Sector Means"]
 
     # Create datasets dictionary
     datasets = {
@@ -67,15 +99,6 @@ if page == "Financial Dashboard":
         "Cash Flow": cash_flow_df
     }
 
-    # Load Ticker-to-Sector map
-    ticker_to_sector = {}
-    if 'ticker' in financial_df.columns and 'sector' in financial_df.columns:
-        ticker_to_sector = financial_df.set_index('ticker')['sector'].to_dict()
-    
-    # Set sector as index for sector_means_df
-    if 'sector' in sector_means_df.columns:
-        sector_means_df = sector_means_df.set_index('sector')
-
     ticker = st.text_input("Enter ASX Ticker (e.g., NAB, CBA, ANZ):").strip().upper()
 
     if ticker:
@@ -89,15 +112,15 @@ if page == "Financial Dashboard":
                 st.warning(f"No data available for {section}")
                 continue
 
-            if ticker not in df['ticker'].values:
+            if ticker not in df.index:
                 st.warning(f"{ticker} not found in {section}")
                 continue
 
             try:
                 # Run find_similar_companies for this dataset
-                similarity_results = find_similar_companies(df, threshold=0.1)
+                similarity_results = similar_companies(df)
 
-                row = df[df['ticker'] == ticker].iloc[0]
+                row = df.loc[[ticker]].iloc[0]
                 cols_to_drop = ['ticker']
                 if 'sector' in row.index:
                     cols_to_drop.append('sector')
@@ -106,62 +129,43 @@ if page == "Financial Dashboard":
                 if row.empty:
                     st.info("No available data.")
                 else:
-                    industry_averages = []
-                    industry_companies = []
-                    for metric in row.index:
-                        avg_value = "N/A"
-                        if sector_average_row is not None and metric in sector_average_row.index:
-                            avg_value = format_number(sector_average_row[metric])
-                        industry_averages.append(avg_value)
-                        
-                        # Get industry companies with their metric values
-                        industry_peers = get_industry_companies_with_metrics(df, ticker, metric, top_n=3)
-                        industry_companies.append(industry_peers)
+                    # Format values and sector averages column-wise rather than per cell
+                    values = format_numbers(row)
+                    if sector_average_row is not None:
+                        averages = sector_average_row.reindex(row.index)
+                        industry_averages = format_numbers(averages).where(row.index.isin(sector_average_row.index), "N/A")
+                    else:
+                        industry_averages = pd.Series("N/A", index=row.index)
+
+                    # Get industry companies with their metric values
+                    industry_companies = industry_peers(df, ticker, tuple(row.index))
 
                     clean_df = pd.DataFrame({
                         "Metric": row.index,
-                        "Value": [format_number(v) for v in row.values],
-                        "Company that has similar metric": [similarity_results.get(ticker, {}).get(metric, "N/A") for metric in row.index],
-                        "Industry Companies": industry_companies,
-                        "Industry Average": industry_averages
+                        "Value": values.values,
+                        "Company that has similar metric": [similarity_results.get(ticker, {}).get(metric, "N/A").split("\n") for metric in row.index],
+                        "Industry Companies": [industry_companies[metric].split("\n") for metric in row.index],
+                        "Industry Average": industry_averages.values
                     })
 
-                    # Create table layout
-                    with st.container():
-                        st.markdown('<div class="table-header">', unsafe_allow_html=True)
-                        col1, col2, col3, col4, col5, col6 = st.columns([2, 2, 1, 3, 3, 2])
-                        with col1:
-                            st.markdown('<div class="table-cell metric">Metric</div>', unsafe_allow_html=True)
-                        with col2:
-                            st.markdown('<div class="table-cell value">Value</div>', unsafe_allow_html=True)
-                        with col3:
-                            st.markdown('<div class="table-cell notes">Notes</div>', unsafe_allow_html=True)
-                        with col4:
-                            st.markdown('<div class="table-cell similar">Company that has similar metric</div>', unsafe_allow_html=True)
-                        with col5:
-                            st.markdown('<div class="table-cell industry">Industry Companies</div>', unsafe_allow_html=True)
-                        with col6:
-                            st.markdown('<div class="table-cell spacer">Industry Average</div>', unsafe_allow_html=True)
-                        st.markdown('</div>', unsafe_allow_html=True)
-
-                        for idx, row in clean_df.iterrows():
-                            st.markdown('<div class="table-row">', unsafe_allow_html=True)
-                            col1, col2, col3, col4, col5, col6 = st.columns([2, 2, 1, 3, 3, 2])
-                            with col1:
-                                st.markdown(f'<div class="table-cell metric">{row["Metric"]}</div>', unsafe_allow_html=True)
-                            with col2:
-                                st.markdown(f'<div class="table-cell value">{row["Value"]}</div>', unsafe_allow_html=True)
-                            with col3:
-                                with st.popover("View"):
-                                    definition = definitions.get(row["Metric"], "No definition available")
-                                    st.markdown(definition)
-                            with col4:
-                                st.markdown(f'<div class="table-cell similar">{row["Company that has similar metric"]}</div>', unsafe_allow_html=True)
-                            with col5:
-                                st.markdown(f'<div class="table-cell industry">{row["Industry Companies"]}</div>', unsafe_allow_html=True)
-                            with col6:
-                                st.markdown(f'<div class="table-cell industry-avg">{row["Industry Average"]}</div>', unsafe_allow_html=True)
-                            st.markdown('</div>', unsafe_allow_html=True)
+                    # Render the whole table as one component instead of a widget grid per row
+                    st.dataframe(
+                        clean_df,
+                        column_config={
+                            "Metric": st.column_config.TextColumn("Metric", width="medium"),
+                            "Value": st.column_config.TextColumn("Value"),
+                            "Company that has similar metric": st.column_config.ListColumn("Company that has similar metric", width="large"),
+                            "Industry Companies": st.column_config.ListColumn("Industry Companies", width="large"),
+                            "Industry Average": st.column_config.TextColumn("Industry Average"),
+                        },
+                        width="stretch",
+                        hide_index=True,
+                    )
+
+                    # Definitions used to live in a per-row popover
+                    with st.expander("Notes"):
+                        for metric in clean_df["Metric"]:
+                            st.markdown(definitions.get(metric, f"**{metric}**: No definition available"))
 
             except Exception as e:
                 st.error(f"Error loading {section}: {e}")
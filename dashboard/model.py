@@ -1,36 +1,26 @@
 import io
+import hashlib
 import pdfplumber
 import os
+import time
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import google.generativeai as genai
 import streamlit as st
+from pathlib import Path
 
-# Move the API configuration inside the function to avoid import issues
-model = None
+try:
+    # Optional: much faster text extraction; pdfplumber is used when it's missing
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
 
-def get_model():
-    """Initialize the model with API key from secrets"""
-    global model
-    if model is None:
-        genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
-        model = genai.GenerativeModel("gemini-2.0-flash")
-    return model
+MODEL_NAME = "gemini-2.0-flash"
 
-def read_report(file) -> str:
-    """Return plain text from an uploaded PDF or text file."""
-    name = file.name.lower()
-    if name.endswith(".pdf"):
-        text_chunks = []
-        with pdfplumber.open(io.BytesIO(file.read())) as pdf:
-            for page in pdf.pages:
-                text_chunks.append(page.extract_text() or "")
-        return "\n\n".join(text_chunks)
-    else:
-        # Assume text-like files
-        return file.read().decode("utf-8", errors="ignore")
-
-def build_prompt(user_note: str, ticker: str, report_text: str) -> str:
-    """Build the complete prompt including the report text."""
-    return f"""
+# Static analyst instructions, sent once as the model's system instruction rather than
+# being repeated at the top of every prompt
+SYSTEM_INSTRUCTION = """
 As an equity research analyst, analyze the provided financial report and deliver a concise, professional analysis in Markdown format. Present the analysis as a direct, objective report without referencing the process of reviewing excerpts or using a model. Focus on actionable insights, explicitly noting any missing information without speculation. Structure the response as follows:
 
 # Executive Summary
@@ -44,7 +34,131 @@ As an equity research analyst, analyze the provided financial report and deliver
 
 # Quality of Earnings and Cash Flow
 - Analyze working capital trends, free cash flow conversion, and sustainability of earnings.
+"""
+
+# Move the API configuration inside the function to avoid import issues;
+# cache_resource builds the model once and shares it across reruns and sessions
+@st.cache_resource
+def get_model(model_name: str = MODEL_NAME, system_instruction: str = SYSTEM_INSTRUCTION):
+    """Initialize the model with API key from secrets"""
+    genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
+    return genai.GenerativeModel(model_name, system_instruction=system_instruction)
+
+# Replies are also kept on disk, one file per (model, instructions, prompt) hash, so they
+# survive restarts; files older than the TTL are ignored and pruned on the next write
+LLM_CACHE_DIR = Path.home() / ".cache" / "siif_llm"
+LLM_CACHE_TTL = 7 * 24 * 60 * 60
+
+def _review_cache_path(prompt: str, model_name: str, system_instruction: str) -> Path:
+    key = hashlib.sha256("\0".join((model_name, system_instruction, prompt)).encode("utf-8")).hexdigest()
+    return LLM_CACHE_DIR / f"{key}.md"
+
+def _store_review(path: Path, text: str) -> None:
+    """Write a reply to the disk cache and drop expired ones; best effort only."""
+    try:
+        LLM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        now = time.time()
+        for old in LLM_CACHE_DIR.glob("*.md"):
+            if now - old.stat().st_mtime >= LLM_CACHE_TTL:
+                old.unlink(missing_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        pass  # An unwritable cache just means no reuse across restarts
+
+# The in-memory layer in front skips the disk on reruns; it is bounded because Streamlit
+# ignores ttl on persist="disk" caches and never deletes their files
+@st.cache_data(ttl=24 * 60 * 60, max_entries=64, show_spinner=False)
+def generate_review(prompt: str, model_name: str = MODEL_NAME, system_instruction: str = SYSTEM_INSTRUCTION) -> str:
+    """Return the model's reply to a prompt, cached by (prompt, model, instructions)."""
+    path = _review_cache_path(prompt, model_name, system_instruction)
+    try:
+        if time.time() - path.stat().st_mtime < LLM_CACHE_TTL:
+            return path.read_text(encoding="utf-8")
+    except OSError:
+        pass  # Not cached yet
+
+    resp = get_model(model_name, system_instruction).generate_content(prompt)
+    if not resp.text:
+        return "_No response text returned._"
+    _store_review(path, resp.text)
+    return resp.text
 
+# Below this many pages, starting worker processes costs more than it saves
+PARALLEL_MIN_PAGES = 16
+
+def _extract_pages(path: str, start: int, stop: int) -> list:
+    """Extract text from pages [start, stop) of a PDF file; runs in a worker process."""
+    with pdfplumber.open(path) as pdf:
+        return [page.extract_text() or "" for page in pdf.pages[start:stop]]
+
+def _extract_text_pdfium(data: bytes) -> str:
+    """Return the text of every page using pdfium's C++ text extractor."""
+    pdf = pdfium.PdfDocument(data)
+    try:
+        texts = []
+        for page in pdf:
+            textpage = page.get_textpage()
+            texts.append(textpage.get_text_range().replace("\r\n", "\n"))
+            textpage.close()
+            page.close()
+        return "\n\n".join(texts)
+    finally:
+        pdf.close()
+
+def extract_pdf_text(data: bytes) -> str:
+    """Return the text of every page of a PDF.
+
+    Uses pdfium when installed; otherwise pdfplumber, split across processes for long reports.
+    """
+    if pdfium is not None:
+        try:
+            return _extract_text_pdfium(data)
+        except pdfium.PdfiumError:
+            pass  # Let pdfplumber have a go at PDFs pdfium can't open
+
+    # pdfminer parses in pure Python, so threads would just queue on the GIL
+    workers = min(os.cpu_count() or 1, 8)
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        n_pages = len(pdf.pages)
+        if n_pages < PARALLEL_MIN_PAGES or workers < 2:
+            return "\n\n".join(page.extract_text() or "" for page in pdf.pages)
+
+    step = -(-n_pages // workers)
+    starts = range(0, n_pages, step)
+    # Workers open a temp copy rather than each being sent the pickled bytes, and are
+    # spawned because forking the multi-threaded Streamlit server can deadlock
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=len(starts), mp_context=ctx) as ex:
+            parts = ex.map(_extract_pages, [path] * len(starts), starts, [s + step for s in starts])
+            return "\n\n".join(text for part in parts for text in part)
+    finally:
+        os.remove(path)
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _cached_pdf_text(pdf_hash: str, _data: bytes) -> str:
+    """extract_pdf_text keyed by the PDF's content hash (the bytes themselves aren't hashed)."""
+    return extract_pdf_text(_data)
+
+def read_report(file) -> str:
+    """Return plain text from an uploaded PDF or text file."""
+    name = file.name.lower()
+    if name.endswith(".pdf"):
+        data = file.read()
+        # Re-uploading or re-analyzing the same PDF reuses its extracted text
+        return _cached_pdf_text(hashlib.md5(data).hexdigest(), data)
+    else:
+        # Assume text-like files
+        return file.read().decode("utf-8", errors="ignore")
+
+def build_prompt(user_note: str, ticker: str, report_text: str) -> str:
+    """Build the per-report prompt: context plus the report text."""
+    return f"""
 Context:
 - Ticker: {ticker or 'N/A'}
 - User Note: {user_note or 'N/A'}
@@ -56,9 +170,6 @@ FINANCIAL REPORT:
 def analyze_report(file, ticker: str = None, user_note: str = None) -> str:
     """Analyze the uploaded report and return the generated review."""
     try:
-        # Get the model instance
-        model_instance = get_model()
-        
         # Extract text from the file
         raw_text = read_report(file)
         if not raw_text.strip():
@@ -67,9 +178,8 @@ def analyze_report(file, ticker: str = None, user_note: str = None) -> str:
         # Build the complete prompt with the report text
         prompt = build_prompt(user_note or "", ticker or "", raw_text)
         
-        # Generate content with the complete prompt
-        resp = model_instance.generate_content(prompt)
-        return resp.text or "_No response text returned._"
+        # Generate content with the complete prompt; repeat analyses skip the API call
+        return generate_review(prompt, MODEL_NAME, SYSTEM_INSTRUCTION)
 
     except Exception as e:
         return f"Error analyzing the report: {e}"
\ No newline at end of file
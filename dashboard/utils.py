@@ -11,6 +11,47 @@ def format_number(val):
     except Exception:
         return str(val)
 
+def format_numbers(values):
+    """
+    Vectorized format_number: format a whole Series (or array-like) in one pass.
+    Returns a Series of strings with the same index.
+    """
+    values = pd.Series(values, dtype=object)
+    nums = pd.to_numeric(values, errors='coerce').astype(float)
+    out = values.astype(str)
+
+    numeric = nums.notna()
+    is_int = numeric & np.isfinite(nums) & (nums % 1 == 0)
+    is_dec = numeric & ~is_int
+    # Format whole numbers from the float (no int64 overflow); + 0.0 turns -0.0 into 0.0
+    out[is_int] = (nums[is_int] + 0.0).map('{:,.0f}'.format)
+    out[is_dec] = nums[is_dec].map('{:,.2f}'.format)
+    return out
+
+def optimize_dtypes(data, label_cols=('ticker', 'sector', 'industry')):
+    """
+    Tighten column dtypes once at load time.
+    
+    Label columns become 'category' (equality checks compare integer codes), and object
+    columns whose non-null values are all numeric become float64.
+    
+    Returns:
+    - pandas DataFrame: a converted copy of data
+    """
+    data = data.copy()
+    for col in data.columns:
+        if col in label_cols:
+            data[col] = data[col].astype('category')
+        elif data[col].dtype == object:
+            converted = pd.to_numeric(data[col], errors='coerce')
+            # Only convert when nothing but missing values would be lost
+            if converted.notna().sum() == data[col].notna().sum():
+                data[col] = converted.astype(np.float64)
+    return data
+
+# Upper bound on the (rows x companies) temporaries find_similar_companies builds at once
+SIMILARITY_BLOCK_CELLS = 4_000_000
+
 def find_similar_companies(data, threshold=0.1, skip_cols=None, max_results=3):
     """
     For each company (row, indexed by Ticker) and each numeric metric column (excluding skipped columns),
@@ -35,37 +76,49 @@ def find_similar_companies(data, threshold=0.1, skip_cols=None, max_results=3):
     # Keep only numeric columns that are not in skip_cols
     numeric_cols = [
         col for col in data.columns
-        if np.issubdtype(data[col].dtype, np.number) and col not in skip_cols
+        if pd.api.types.is_numeric_dtype(data[col].dtype)
+        and not pd.api.types.is_bool_dtype(data[col].dtype)
+        and col not in skip_cols
     ]
     
-    companies = data.index.values
+    companies = data.index.to_numpy()
     result = {company: {} for company in companies}
     
-    for company in companies:
-        company_row = data.loc[company]
+    # One float matrix (companies x metrics) instead of a .loc lookup per pair
+    values = data[numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+    # Missing / zero values are never similar and get "N/A" for their own row
+    valid = ~np.isnan(values) & (values != 0)
+    # Integer codes per ticker, so "not the same company" is a cheap int comparison
+    codes = pd.factorize(companies)[0]
+    # Compare a block of rows at a time so temporaries stay ~SIMILARITY_BLOCK_CELLS, not N x N
+    n = len(companies)
+    block = max(1, SIMILARITY_BLOCK_CELLS // max(n, 1))
+    
+    for j, metric in enumerate(numeric_cols):
+        col = values[:, j]
         
-        for metric in numeric_cols:
-            value = company_row[metric]
+        # With fewer than two usable values there is nothing to compare, so skip the pairwise work
+        if valid[:, j].sum() < 2:
+            for i, company in enumerate(companies):
+                result[company][metric] = "None" if valid[i, j] else "N/A"
+            continue
+        
+        for start in range(0, n, block):
+            rows = slice(start, start + block)
             
-            # Handle missing / zero values
-            if pd.isna(value) or value == 0:
-                result[company][metric] = "N/A"
-                continue
+            # Relative similarity check for every (company, other) pair in the block at once
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rel = np.abs(col[rows, None] - col[None, :]) / np.abs(col[rows, None])
+            similar = (rel <= threshold) & valid[:, j][None, :] & (codes[rows, None] != codes[None, :])
             
-            similar = []
-            for other in companies:
-                if other == company:
-                    continue
-                oth_val = data.loc[other, metric]
-                
-                if pd.isna(oth_val) or oth_val == 0:
+            for offset, company in enumerate(companies[rows]):
+                if not valid[start + offset, j]:
+                    result[company][metric] = "N/A"
                     continue
-                
-                # Relative similarity check
-                if abs(value - oth_val) / abs(value) <= threshold:
-                    similar.append(f"{other} ({oth_val:.2f})")
-            similar = similar[:max_results]
-            result[company][metric] = "\n".join(similar) if similar else "None"
+                peers = np.flatnonzero(similar[offset])[:max_results]
+                result[company][metric] = "\n".join(
+                    f"{companies[k]} ({col[k]:.2f})" for k in peers
+                ) if peers.size else "None"
     
     return result
 
@@ -83,40 +136,37 @@ def get_industry_companies_with_metrics(data, target_company, metric_col, top_n=
     - str: formatted string with company tickers and their metric values, or "N/A"
     """
     
-    # Find target company's industry
-    target_row = data[data['ticker'] == target_company]
-    if target_row.empty:
+    # Series comparisons, so category columns compare integer codes
+    is_target = (data['ticker'] == target_company).to_numpy()
+    if not is_target.any():
         return "N/A"
     
-    target_industry = target_row['industry'].iloc[0]
+    # Find target company's industry
+    target_industry = data['industry'].iat[is_target.argmax()]
     
     # Find other companies in same industry with non-null values for the metric
-    same_industry = data[
-        (data['industry'] == target_industry) & 
-        (data['ticker'] != target_company) &
-        (data[metric_col].notna())
-    ]
+    # (a missing industry matches nothing, as with pandas' == comparison)
+    if pd.isna(target_industry):
+        return "None"
+    mask = (data['industry'] == target_industry).to_numpy() & ~is_target & data[metric_col].notna().to_numpy()
     
-    if same_industry.empty:
+    if not mask.any():
         return "None"
     
     # Convert to numeric for sorting, but keep original values for display
-    same_industry = same_industry.copy()
-    numeric_col = pd.to_numeric(same_industry[metric_col], errors='coerce')
-    same_industry['_numeric_sort'] = numeric_col
-    
-    # Sort by numeric value (descending) and take top_n
-    same_industry = same_industry.dropna(subset=['_numeric_sort']).sort_values(by='_numeric_sort', ascending=False).head(top_n)
-    
-    # Format results
-    results = []
-    for _, row in same_industry.iterrows():
-        value = row[metric_col]
-        if pd.isna(value):
-            continue
-        
-        # Use format_number function to handle formatting consistently
-        formatted_value = format_number(value)
-        results.append(f"{row['ticker']} ({formatted_value})")
+    peer_tickers = data['ticker'].to_numpy()[mask]
+    peer_values = data[metric_col].to_numpy()[mask]
+    numeric = pd.to_numeric(peer_values, errors='coerce').astype(np.float64)
+    has_number = ~np.isnan(numeric)
+    peer_tickers, peer_values, numeric = peer_tickers[has_number], peer_values[has_number], numeric[has_number]
+    
+    # Largest first; a stable sort keeps row order among ties, so the cut-off is deterministic
+    k = min(top_n, numeric.size)
+    if k <= 0:
+        return "None"
+    top = np.argsort(-numeric, kind='stable')[:k]
+    
+    # Use format_number function to handle formatting consistently
+    results = [f"{peer_tickers[i]} ({format_number(peer_values[i])})" for i in top]
     
-    return "\n".join(results) if results else "None"
\ No newline at end of file
+    return "\n".join(results)
\ No newline at end of file
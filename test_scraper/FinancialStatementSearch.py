@@ -1,27 +1,46 @@
 import os
+import re
+import sys
+import json
 import time
+import asyncio
 import pandas as pd
 from pathlib import Path
+from itertools import zip_longest
+from concurrent.futures import ThreadPoolExecutor
 
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-
-# ---------- Driver ----------
-def make_driver(headless: bool = True) -> webdriver.Chrome:
-    opts = Options()
-    if headless:
-        # New headless is more stable
-        opts.add_argument("--headless=new")
-    opts.add_argument("--no-sandbox")
-    opts.add_argument("--disable-dev-shm-usage")
-    opts.add_argument("--window-size=1920,1080")
-    # Selenium Manager (built-in) will fetch a compatible driver automatically:
-    driver = webdriver.Chrome(options=opts)
-    driver.set_page_load_timeout(60)
-    return driver
+import aiohttp
+from lxml import etree, html
+
+# ---------- Session ----------
+HEADERS = {
+    # Yahoo serves a stripped page (or a 404) to non-browser user agents
+    "User-Agent": (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+    ),
+    "Accept-Language": "en-AU,en;q=0.9",
+}
+
+def make_session() -> aiohttp.ClientSession:
+    return aiohttp.ClientSession(headers=HEADERS, timeout=aiohttp.ClientTimeout(total=30))
+
+# Transient responses worth another try before giving up on a statement
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+async def fetch(session: aiohttp.ClientSession, url: str, params=None, retries: int = 3, backoff: float = 0.3) -> bytes:
+    """GET a URL on the shared session, retrying transient failures with exponential backoff."""
+    for attempt in range(retries + 1):
+        last = attempt == retries
+        try:
+            async with session.get(url, params=params) as resp:
+                if resp.status not in RETRY_STATUSES or last:
+                    resp.raise_for_status()
+                    return await resp.read()
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if last:
+                raise
+        await asyncio.sleep(backoff * 2 ** attempt)
 
 # ---------- Helpers ----------
 def asx_to_yahoo_symbol(ticker: str) -> str:
@@ -29,47 +48,57 @@ def asx_to_yahoo_symbol(ticker: str) -> str:
     # If already has a suffix, keep it. Otherwise append .AX
     return t if "." in t else f"{t}.AX"
 
-def scrape_fin_table(driver: webdriver.Chrome, url: str, out_csv: Path) -> pd.DataFrame:
-    driver.get(url)
+def _has_class(name: str) -> str:
+    # Exact class-token match, so "row" doesn't also hit "rowTitle"
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
 
-    wait = WebDriverWait(driver, 30)
+# Compiled once at import; .xpath("...") would re-compile the expression on every row.
+# Unions come back in document order, like the CSS selector lists they replace
+TABLE_XPATH = etree.XPath(
+    f'//div[{_has_class("tableContainer")}] | //section[@data-testid="financials"] | //div[@id="Main"]'
+)
+# Header hooks in priority order: older layout, aria roles, then any div in the header
+HEADER_XPATHS = tuple(
+    etree.XPath(expr)
+    for expr in (
+        f'.//*[{_has_class("tableHeader")}]//*[{_has_class("column")}]',
+        './/div[@role="columnheader"]',
+        f'.//div[{_has_class("tableHeader")}]//div',
+    )
+)
+ROW_XPATH = etree.XPath(
+    f'.//*[{_has_class("tableBody")}]//*[{_has_class("row")}] | .//*[@data-test="fin-row"]'
+)
+# Row title hooks in priority order; each evaluates straight to a string ("" when nothing matches)
+TITLE_XPATHS = tuple(
+    etree.XPath(f"normalize-space(({expr})[1])")
+    for expr in (
+        f'.//div[{_has_class("rowTitle")}]',
+        f'.//*[{_has_class("sticky")}]',
+        './/*[@data-test="fin-col"]',
+    )
+)
+# In fin-row layouts the leading fin-col is the row title, not a value
+CELL_XPATH = etree.XPath(
+    f'.//div[{_has_class("column")} and not({_has_class("sticky")})]'
+    ' | (.//*[@data-test="fin-col"])[position() > 1]'
+)
 
-    # Try clicking "Expand" if present, but don't fail if it’s missing
-    try:
-        # Common patterns Yahoo uses (may change over time)
-        expand_candidates = [
-            (By.CSS_SELECTOR, "button[aria-label*='Expand']"),
-            (By.CSS_SELECTOR, "button[data-ylk*='expand']"),
-            (By.XPATH, "//button[contains(., 'Expand')]"),
-        ]
-        for how, sel in expand_candidates:
-            try:
-                btn = wait.until(EC.element_to_be_clickable((how, sel)))
-                btn.click()
-                time.sleep(0.5)
-                break
-            except Exception:
-                continue
-    except Exception:
-        pass
+def _text(el) -> str:
+    return " ".join(el.text_content().split())
 
-    # Wait for the table container
-    table = wait.until(
-        EC.presence_of_element_located(
-            # Try a few robust hooks
-            (By.CSS_SELECTOR, "div.tableContainer, section[data-testid='financials'], div#Main")
-        )
-    )
+def parse_fin_table(content: bytes) -> pd.DataFrame:
+    # Yahoo renders the statement table server-side, so no browser is needed
+    doc = html.fromstring(content)
+    tables = TABLE_XPATH(doc)
+    if not tables:
+        raise ValueError("No financial table found in page")
+    table = tables[0]
 
     # Grab headers (years/periods). Keep it tolerant.
     header_texts = []
-    for css in [
-        ".tableHeader .column",                    # older
-        "div[role='columnheader']",                # aria
-        "div.tableHeader div",                     # fallback
-    ]:
-        els = table.find_elements(By.CSS_SELECTOR, css)
-        header_texts = [e.text.strip() for e in els if e.text.strip()]
+    for xp in HEADER_XPATHS:
+        header_texts = [t for t in (_text(e) for e in xp(table)) if t]
         if header_texts:
             break
 
@@ -85,25 +114,15 @@ def scrape_fin_table(driver: webdriver.Chrome, url: str, out_csv: Path) -> pd.Da
 
     # Rows
     rows = []
-    row_blocks = table.find_elements(By.CSS_SELECTOR, ".tableBody .row, [data-test='fin-row']")
-    for r in row_blocks:
+    for r in ROW_XPATH(table):
         # Metric / row title
-        title = ""
-        for css in ["div.rowTitle", ".sticky", "[data-test='fin-col']"]:
-            try:
-                title_el = r.find_element(By.CSS_SELECTOR, css)
-                if title_el.text.strip():
-                    title = title_el.text.strip()
-                    break
-            except Exception:
-                continue
+        title = next((t for t in (xp(r) for xp in TITLE_XPATHS) if t), "")
         if not title:
             # last resort
-            title = (r.text.split("\n", 1)[0] or "N/A").strip()
+            title = next((t.strip() for t in r.itertext() if t.strip()), "N/A")
 
         # Data cells (exclude sticky/title)
-        data_cells = r.find_elements(By.CSS_SELECTOR, "div.column:not(.sticky), [data-test='fin-col']")
-        values = [c.text.strip() for c in data_cells if c.text.strip()]
+        values = [v for v in (_text(c) for c in CELL_XPATH(r)) if v]
 
         row = [title] + values
         rows.append(row)
@@ -116,41 +135,263 @@ def scrape_fin_table(driver: webdriver.Chrome, url: str, out_csv: Path) -> pd.Da
     elif len(headers) > max_len:
         headers = headers[:max_len]
 
-    df = pd.DataFrame(rows, columns=headers)
+    # Build column-wise; zip_longest pads short rows with None
+    columns = dict(enumerate(zip_longest(*rows)))
+    return pd.DataFrame(columns, columns=range(max_len)).set_axis(headers, axis=1)
+
+async def _save_csv(df: pd.DataFrame, out_csv: Path) -> None:
+    # Runs on a worker thread so the event loop keeps fetching; ".csv.gz" paths are gzipped.
+    # The caller creates the output directory once per ticker.
+    await asyncio.to_thread(df.to_csv, out_csv, index=False, lineterminator="\n")
+
+async def scrape_fin_table(session: aiohttp.ClientSession, url: str, types) -> pd.DataFrame:
+    content = await fetch(session, url)
+
+    # The page embeds the API responses it was rendered from; reading those skips the DOM walk
+    df = parse_embedded_timeseries(content, types)
+    if df.empty:
+        try:
+            df = parse_fin_table(content)
+        except ValueError as e:
+            raise ValueError(f"{e}: {url}") from None
 
-    out_csv.parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(out_csv, index=False)
     return df
 
+# ---------- JSON API ----------
+# The statement pages are filled from this endpoint; querying it directly
+# skips the page HTML entirely.
+TIMESERIES_URL = "https://query1.finance.yahoo.com/ws/fundamentals-timeseries/v1/finance/timeseries/{ticker}"
+
+INCOME_TYPES = (
+    "TotalRevenue", "CostOfRevenue", "GrossProfit", "OperatingExpense", "OperatingIncome",
+    "InterestIncome", "InterestExpense", "NetInterestIncome", "PretaxIncome", "TaxProvision",
+    "NetIncomeCommonStockholders", "BasicEPS", "DilutedEPS", "BasicAverageShares",
+    "DilutedAverageShares", "TotalExpenses", "NormalizedIncome", "EBIT", "EBITDA",
+    "ReconciledCostOfRevenue", "ReconciledDepreciation", "NormalizedEBITDA",
+)
+CASH_FLOW_TYPES = (
+    "OperatingCashFlow", "InvestingCashFlow", "FinancingCashFlow", "EndCashPosition",
+    "CapitalExpenditure", "IssuanceOfCapitalStock", "IssuanceOfDebt", "RepaymentOfDebt",
+    "RepurchaseOfCapitalStock", "FreeCashFlow",
+)
+BALANCE_TYPES = (
+    "TotalAssets", "TotalLiabilitiesNetMinorityInterest", "TotalEquityGrossMinorityInterest",
+    "TotalCapitalization", "CommonStockEquity", "NetTangibleAssets", "WorkingCapital",
+    "InvestedCapital", "TangibleBookValue", "TotalDebt", "NetDebt", "ShareIssued",
+    "OrdinarySharesNumber",
+)
+
+# Per-share values are shown as-is; everything else is in thousands like the web page
+UNSCALED_TYPES = {"BasicEPS", "DilutedEPS"}
+# Labels the au. site spells differently from the split type name
+TYPE_LABELS = {"TotalCapitalization": "Total capitalisation"}
+
+_WORD_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z]|\d|$)|[A-Z]?[a-z]+|\d+")
+
+def _type_label(name: str) -> str:
+    # "TotalLiabilitiesNetMinorityInterest" -> "Total liabilities net minority interest"
+    if name in TYPE_LABELS:
+        return TYPE_LABELS[name]
+    words = [w if w.isupper() else w.lower() for w in _WORD_RE.findall(name)]
+    label = " ".join(words)
+    return label[:1].upper() + label[1:]
+
+def _format_value(name: str, raw: float) -> str:
+    if name in UNSCALED_TYPES:
+        return f"{raw:,.2f}"
+    return f"{raw / 1000:,.0f}"
+
+def parse_timeseries(payload: dict, types) -> pd.DataFrame:
+    results = (payload.get("timeseries") or {}).get("result") or []
+
+    # {type: {asOfDate: raw value}} for annual series, {type: raw value} for the TTM column
+    by_type, trailing = {}, {}
+    for res in results:
+        if not isinstance(res, dict):
+            continue
+        for key in (res.get("meta") or {}).get("type") or []:
+            points = {}
+            for p in res.get(key) or []:
+                # Skip malformed points (no date, or only a "fmt" string) rather than failing the ticker
+                if not isinstance(p, dict):
+                    continue
+                date = p.get("asOfDate")
+                raw = (p.get("reportedValue") or {}).get("raw")
+                if date and isinstance(raw, (int, float)):
+                    points[date] = raw
+            if not points:
+                continue
+            if key.startswith("trailing"):
+                # The page's TTM column is the latest trailing-twelve-months point
+                trailing[key.removeprefix("trailing")] = points[max(points)]
+            else:
+                by_type[key.removeprefix("annual")] = points
+
+    if not by_type:
+        return pd.DataFrame()
+
+    # Newest period first, labelled d/m/yyyy like the au. site
+    dates = sorted({d for points in by_type.values() for d in points}, reverse=True)
+    periods = [f"{int(d[8:10])}/{int(d[5:7])}/{d[:4]}" for d in dates]
+    names = [name for name in types if name in by_type]
+    # Income and cash-flow pages lead with a TTM column; the balance sheet has none
+    has_ttm = any(name in trailing for name in names)
+    headers = ["Breakdown"] + (["TTM"] if has_ttm else []) + periods
+
+    # Build column-wise: one list per period rather than one per row
+    if not names:
+        return pd.DataFrame(columns=headers)
+    columns = {"Breakdown": [_type_label(name) for name in names]}
+    if has_ttm:
+        columns["TTM"] = [
+            _format_value(name, trailing[name]) if name in trailing else "--"
+            for name in names
+        ]
+    for d, header in zip(dates, periods):
+        columns[header] = [
+            _format_value(name, by_type[name][d]) if d in by_type[name] else "--"
+            for name in names
+        ]
+
+    return pd.DataFrame(columns)
+
+# <script type="application/json" data-sveltekit-fetched data-url="...fundamentals-timeseries...">
+_EMBEDDED_RE = re.compile(
+    rb'<script[^>]*data-url="[^"]*fundamentals-timeseries[^"]*"[^>]*>(.*?)</script>', re.S
+)
+
+def parse_embedded_timeseries(content: bytes, types) -> pd.DataFrame:
+    results = []
+    for m in _EMBEDDED_RE.finditer(content):
+        try:
+            blob = json.loads(m.group(1))
+            # The fetched response body is stored as a JSON string inside the wrapper
+            body = blob.get("body")
+            payload = json.loads(body) if isinstance(body, str) else (body or blob)
+        except (ValueError, AttributeError):
+            continue
+        if not isinstance(payload, dict):
+            # e.g. a "null" or array body
+            continue
+        results.extend(((payload.get("timeseries") or {}).get("result")) or [])
+    return parse_timeseries({"timeseries": {"result": results}}, types)
+
+async def fetch_timeseries_table(session: aiohttp.ClientSession, y_ticker: str, types) -> pd.DataFrame:
+    params = {
+        "type": ",".join(f"{prefix}{t}" for prefix in ("annual", "trailing") for t in types),
+        "period1": 493590046,  # same lower bound the web page uses
+        "period2": int(time.time()),
+    }
+    payload = json.loads(await fetch(session, TIMESERIES_URL.format(ticker=y_ticker), params=params))
+    return parse_timeseries(payload, types)
+
+def _run(coro):
+    """Run a coroutine to completion, even from inside a running loop (e.g. Jupyter)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        with ThreadPoolExecutor(max_workers=1) as ex:
+            return ex.submit(asyncio.run, coro).result()
+    return asyncio.run(coro)
+
 # ---------- Orchestrator ----------
-def get_financial_data(ticker: str, base_dir: Path | None = None):
+YAHOO_QUOTE_URL = "https://au.finance.yahoo.com/quote/{ticker}/{slug}/"
+
+# key -> (Yahoo URL slug, output file name, timeseries types)
+STATEMENTS = {
+    "financials": ("financials",    "IncomeStatement.csv", INCOME_TYPES),
+    "cash_flow":  ("cash-flow",     "CashFlow.csv",        CASH_FLOW_TYPES),
+    "balance":    ("balance-sheet", "BalanceSheet.csv",    BALANCE_TYPES),
+}
+
+async def scrape_statement(session: aiohttp.ClientSession, y_ticker: str, slug: str, types) -> pd.DataFrame:
+    try:
+        df = await fetch_timeseries_table(session, y_ticker, types)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+        df = pd.DataFrame()
+
+    if df.empty:
+        # Fall back to the rendered statement page
+        url = YAHOO_QUOTE_URL.format(ticker=y_ticker, slug=slug)
+        return await scrape_fin_table(session, url, types)
+
+    return df
+
+async def _scrape_ticker(session: aiohttp.ClientSession, ticker: str, base: Path, gzip: bool = False) -> asyncio.Future:
+    """Fetch one ticker's statements; returns the still-running future that writes the CSVs."""
     y_ticker = asx_to_yahoo_symbol(ticker)
-    base = (base_dir or (Path.cwd() / "company_data" / ticker.upper()))
     base.mkdir(parents=True, exist_ok=True)
+    print(f"Saving outputs to: {base}")
 
-    driver = make_driver(headless=True)
-    try:
-        print(f"Saving outputs to: {base}")
-
-        urls = {
-            "financials": f"https://au.finance.yahoo.com/quote/{y_ticker}/financials/",
-            "cash_flow":  f"https://au.finance.yahoo.com/quote/{y_ticker}/cash-flow/",
-            "balance":    f"https://au.finance.yahoo.com/quote/{y_ticker}/balance-sheet/",
-        }
-        outputs = {
-            "financials": base / "IncomeStatement.csv",
-            "cash_flow":  base / "CashFlow.csv",
-            "balance":    base / "BalanceSheet.csv",
-        }
-
-        for key in ["financials", "cash_flow", "balance"]:
-            print(f"Scraping {key} …")
-            df = scrape_fin_table(driver, urls[key], outputs[key])
-            print(f"Saved {key} → {outputs[key]} (rows={len(df)})")
-
-    finally:
-        print("Closing the browser.")
-        driver.quit()
+    print(f"Scraping {', '.join(STATEMENTS)} …")
+    # The three statements are independent, so fetch them concurrently; one failing
+    # must not throw away the others
+    results = await asyncio.gather(*(
+        scrape_statement(session, y_ticker, slug, types)
+        for slug, filename, types in STATEMENTS.values()
+    ), return_exceptions=True)
+
+    outputs = [base / (filename + (".gz" if gzip else "")) for _, filename, _ in STATEMENTS.values()]
+    saves, failures = [], []
+    for key, out_csv, result in zip(STATEMENTS, outputs, results):
+        if isinstance(result, BaseException):
+            print(f"Error fetching {key} for {ticker}: {result}")
+            failures.append(result)
+        else:
+            print(f"Saving {key} → {out_csv} (rows={len(result)})")
+            saves.append(_save_csv(result, out_csv))
+
+    # Write in the background so a batch can start on the next ticker straight away
+    writes = asyncio.gather(*saves)
+
+    async def finish():
+        await writes
+        if failures:
+            # The statements that did come back are saved; now surface the first failure
+            raise failures[0]
+
+    return asyncio.ensure_future(finish())
+
+async def _get_many_financial_data(tickers, root: Path, gzip: bool = False):
+    writes = {}
+    # One session for the whole batch, so connections to Yahoo are kept alive between tickers
+    async with make_session() as session:
+        for ticker in tickers:
+            try:
+                writes[ticker] = await _scrape_ticker(session, ticker, root / ticker.upper(), gzip)
+            except Exception as e:
+                print(f"Error fetching {ticker}: {e}")
+
+    results = await asyncio.gather(*writes.values(), return_exceptions=True)
+    for ticker, result in zip(writes, results):
+        if isinstance(result, Exception):
+            print(f"Error for {ticker}: {result}")
+
+def get_financial_data(ticker: str, base_dir: Path | None = None):
+    base = (base_dir or (Path.cwd() / "company_data" / ticker.upper()))
+
+    async def scrape():
+        async with make_session() as session:
+            await (await _scrape_ticker(session, ticker, base))
+
+    _run(scrape())
+
+def get_many_financial_data(tickers, base_dir: Path | None = None, gzip: bool = False):
+    """
+    Scrape several tickers over one HTTP session; outputs go to base_dir/<TICKER>/.
+    With gzip=True the statements are written as .csv.gz, roughly halving bytes on disk.
+    """
+    root = (base_dir or (Path.cwd() / "company_data"))
+    _run(_get_many_financial_data(tickers, root, gzip))
 
 # Example:
-# get_financial_data("CBA")  # will use CBA.AX
\ No newline at end of file
+# get_financial_data("CBA")  # will use CBA.AX
+# python FinancialStatementSearch.py [--gzip] CBA NAB ANZ   (or one ticker per line on stdin)
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    gzip = "--gzip" in args
+    tickers = [a for a in args if a != "--gzip"] or [line.strip() for line in sys.stdin if line.strip()]
+    get_many_financial_data(tickers, gzip=gzip)
\ No newline at end of file